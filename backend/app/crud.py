@@ -1,10 +1,32 @@
+from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 import database.models as models
 import app.schemas as schemas
 from core.config import settings
 import uuid
 
+# --- Keyset pagination ---
+# Pages are ordered newest first by (timestamp, id); the cursor holds the key of the
+# last row returned, so each page is a bounded index range scan instead of an OFFSET.
+def _apply_time_range(query, ts_column, created_after: Optional[datetime], created_before: Optional[datetime]):
+    if created_after is not None:
+        query = query.filter(ts_column >= created_after)
+    if created_before is not None:
+        query = query.filter(ts_column < created_before)
+    return query
+
+def _apply_keyset(query, ts_column, id_column, after: Optional[Tuple[datetime, object]], limit: int):
+    if after is not None:
+        after_ts, after_id = after
+        query = query.filter(or_(
+            ts_column < after_ts,
+            and_(ts_column == after_ts, id_column < after_id)
+        ))
+    # Fetch one extra row to know whether a next page exists
+    return query.order_by(ts_column.desc(), id_column.desc()).limit(limit + 1).all()
+
 # --- Order ---
 def get_order(db: Session, order_id: bytes):
     return db.query(models.Order).filter(models.Order.id == order_id).first()
@@ -24,6 +46,20 @@ def create_order(db: Session, order: schemas.OrderCreate):
     db.refresh(db_order)
     return db_order
 
+def list_orders(db: Session, limit: int, after: Optional[Tuple[datetime, bytes]] = None,
+                merchant_address: Optional[bytes] = None, buyer_address: Optional[bytes] = None,
+                status: Optional[str] = None, created_after: Optional[datetime] = None,
+                created_before: Optional[datetime] = None):
+    query = db.query(models.Order)
+    if merchant_address is not None:
+        query = query.filter(models.Order.merchant_address == merchant_address)
+    if buyer_address is not None:
+        query = query.filter(models.Order.buyer_address == buyer_address)
+    if status is not None:
+        query = query.filter(models.Order.status == status)
+    query = _apply_time_range(query, models.Order.created_at, created_after, created_before)
+    return _apply_keyset(query, models.Order.created_at, models.Order.id, after, limit)
+
 # --- OTP Session ---
 def get_active_otp_session(db: Session, order_id: bytes):
     return db.query(models.OtpSession).filter(
@@ -39,11 +75,12 @@ def revoke_existing_otp_sessions(db: Session, order_id: bytes):
     # Commit is handled in the calling function to ensure atomicity
     # db.commit()
 
-def create_otp_session(db: Session, order_id: bytes, buyer_address: bytes, otp_hash: bytes, qr_hash: bytes, gps_hash: bytes, device_id: str, auto_commit: bool = False):
+def create_otp_session(db: Session, order_id: bytes, buyer_address: bytes, otp_hash: bytes, qr_hash: bytes, gps_hash: bytes, device_id: str, auto_commit: bool = False, merchant_address: bytes = None):
     expires_at = datetime.utcnow() + timedelta(seconds=settings.OTP_TTL_SECONDS)
     db_session = models.OtpSession(
         order_id=order_id,
         buyer_address=buyer_address,
+        merchant_address=merchant_address,
         otp_hash=otp_hash,
         qr_token_hash=qr_hash,
         expires_at=expires_at,
@@ -61,6 +98,20 @@ def use_otp_session(db: Session, otp_session_id: uuid.UUID):
     db.query(models.OtpSession).filter(models.OtpSession.otp_id == otp_session_id).update({"status": "USED"})
     db.commit()
 
+def list_otp_sessions(db: Session, limit: int, after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                      merchant_address: Optional[bytes] = None, buyer_address: Optional[bytes] = None,
+                      status: Optional[str] = None, created_after: Optional[datetime] = None,
+                      created_before: Optional[datetime] = None):
+    query = db.query(models.OtpSession)
+    if merchant_address is not None:
+        query = query.filter(models.OtpSession.merchant_address == merchant_address)
+    if buyer_address is not None:
+        query = query.filter(models.OtpSession.buyer_address == buyer_address)
+    if status is not None:
+        query = query.filter(models.OtpSession.status == status)
+    query = _apply_time_range(query, models.OtpSession.issued_at, created_after, created_before)
+    return _apply_keyset(query, models.OtpSession.issued_at, models.OtpSession.otp_id, after, limit)
+
 # --- Delivery ---
 def create_delivery_record(db: Session, delivery_data: dict, auto_commit: bool = True):
     db_delivery = models.Delivery(**delivery_data)
@@ -69,3 +120,41 @@ def create_delivery_record(db: Session, delivery_data: dict, auto_commit: bool =
         db.commit()
         db.refresh(db_delivery)
     return db_delivery
+
+def list_deliveries(db: Session, limit: int, after: Optional[Tuple[datetime, uuid.UUID]] = None,
+                    merchant_address: Optional[bytes] = None, buyer_address: Optional[bytes] = None,
+                    created_after: Optional[datetime] = None, created_before: Optional[datetime] = None):
+    query = db.query(models.Delivery)
+    if merchant_address is not None:
+        query = query.filter(models.Delivery.merchant_address == merchant_address)
+    if buyer_address is not None:
+        query = query.filter(models.Delivery.buyer_address == buyer_address)
+    query = _apply_time_range(query, models.Delivery.created_at, created_after, created_before)
+    return _apply_keyset(query, models.Delivery.created_at, models.Delivery.delivery_id, after, limit)
+
+# --- Delivery Photo ---
+def get_delivery_photo(db: Session, sha256: str):
+    return db.query(models.DeliveryPhoto).filter(models.DeliveryPhoto.sha256 == sha256).first()
+
+def create_delivery_photo(db: Session, sha256: str, size_bytes: int, content_type: str):
+    db_photo = models.DeliveryPhoto(sha256=sha256, size_bytes=size_bytes, content_type=content_type)
+    db.add(db_photo)
+    db.commit()
+    db.refresh(db_photo)
+    return db_photo
+
+def requeue_delivery_photo(db: Session, sha256: str) -> bool:
+    """Marks a photo that is not PROCESSED as PENDING again. Returns True if it was requeued."""
+    updated = db.query(models.DeliveryPhoto)\
+                .filter(models.DeliveryPhoto.sha256 == sha256, models.DeliveryPhoto.status != 'PROCESSED')\
+                .update({"status": "PENDING"})
+    db.commit()
+    return updated > 0
+
+def get_pending_delivery_photo_hashes(db: Session):
+    rows = db.query(models.DeliveryPhoto.sha256).filter(models.DeliveryPhoto.status == 'PENDING').all()
+    return [row.sha256 for row in rows]
+
+def update_delivery_photo(db: Session, sha256: str, values: dict):
+    db.query(models.DeliveryPhoto).filter(models.DeliveryPhoto.sha256 == sha256).update(values)
+    db.commit()
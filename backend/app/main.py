@@ -1,10 +1,15 @@
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header, Query, Request, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+from typing import Optional
 import time
 import base64
 import hmac
+import uuid
 
 import app.crud as crud
 import app.schemas as schemas
@@ -15,12 +20,27 @@ from core.security import (
     sign_release_auth
 )
 from utils.geo import calculate_distance_m, hash_gps
+from utils.pagination import encode_cursor, decode_cursor, compute_etag, etag_matches
 from app.relayer import send_release_transaction
+from app.services import (
+    get_photo_storage, submit_delivery_photo, start_photo_executor, shutdown_photo_executor
+)
+from utils.storage import PayloadTooLarge, content_uri
+from utils.uploads import (
+    InvalidUpload, UnsupportedMediaType, MULTIPART_OVERHEAD_BYTES, stream_multipart_file
+)
 
-# Create database tables on startup
+# Create database tables on startup (existing databases are upgraded with `python -m database.migrations`)
 Base.metadata.create_all(bind=engine)
 
-app = FastAPI(title="Escrow DApp Backend")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Starts the photo pool and re-queues processing interrupted by a previous shutdown
+    start_photo_executor()
+    yield
+    shutdown_photo_executor()
+
+app = FastAPI(title="Escrow DApp Backend", lifespan=lifespan)
 
 # Configure CORS for frontend communication
 app.add_middleware(
@@ -36,6 +56,65 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+# --- Helpers para los endpoints de lectura paginados ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def _hex(value: Optional[bytes]) -> Optional[str]:
+    return '0x' + value.hex() if value is not None else None
+
+def _ts(value: Optional[datetime]) -> Optional[int]:
+    return int(value.timestamp()) if value is not None else None
+
+def _parse_address(value: Optional[str], field: str) -> Optional[bytes]:
+    if value is None:
+        return None
+    try:
+        address = bytes.fromhex(value[2:] if value.startswith("0x") else value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+    # Las direcciones se guardan como los 20 bytes crudos de la cuenta
+    if len(address) != 20:
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+    return address
+
+def _parse_time(value: Optional[int], field: str) -> Optional[datetime]:
+    if value is None:
+        return None
+    try:
+        return datetime.fromtimestamp(value, tz=timezone.utc)
+    except (OverflowError, ValueError, OSError):
+        raise HTTPException(status_code=400, detail=f"Invalid {field}")
+
+def _parse_cursor(cursor: Optional[str], to_id=lambda raw: raw):
+    if cursor is None:
+        return None
+    try:
+        created_at, raw_id = decode_cursor(cursor)
+        return created_at, to_id(raw_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _paginate(rows, limit: int, key_of, state_of, serialize, response: Response, if_none_match: Optional[str]):
+    """
+    Builds a keyset page from `limit + 1` rows. The ETag only covers the cursor keys and
+    mutable state of each row, so a matching If-None-Match returns 304 before any row is serialized.
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(*key_of(rows[-1])) if has_more else None
+
+    etag = compute_etag([state_of(row) for row in rows] + [(next_cursor or "").encode()])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return {
+        "items": [serialize(row) for row in rows],
+        "next_cursor": next_cursor
+    }
+
 # Endpoint para que el frontend registre un pedido
 @app.post("/orders", response_model=schemas.OrderResponse, status_code=201)
 def register_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
@@ -54,6 +133,50 @@ def register_order(order: schemas.OrderCreate, db: Session = Depends(get_db)):
         "status": created_order.status
     }
 
+@app.get("/orders", response_model=schemas.OrderPage)
+def list_orders(
+    response: Response,
+    merchant_address: Optional[str] = None,
+    buyer_address: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Lists orders newest first for merchant dashboards, using keyset pagination on (created_at, id).
+    """
+    rows = crud.list_orders(
+        db, limit,
+        after=_parse_cursor(cursor),
+        merchant_address=_parse_address(merchant_address, "merchant_address"),
+        buyer_address=_parse_address(buyer_address, "buyer_address"),
+        status=status,
+        created_after=_parse_time(created_after, "created_after"),
+        created_before=_parse_time(created_before, "created_before")
+    )
+    return _paginate(
+        rows, limit,
+        key_of=lambda o: (o.created_at, o.id),
+        state_of=lambda o: o.id + o.status.encode(),
+        serialize=lambda o: {
+            "order_id": _hex(o.id),
+            "merchant_address": _hex(o.merchant_address),
+            "buyer_address": _hex(o.buyer_address),
+            "amount": o.amount,
+            "timeout": _ts(o.timeout),
+            "status": o.status,
+            "created_at": _ts(o.created_at),
+            "destination_lat": float(o.destination_lat) if o.destination_lat else None,
+            "destination_lon": float(o.destination_lon) if o.destination_lon else None
+        },
+        response=response,
+        if_none_match=if_none_match
+    )
+
 # Informacion que se le pide al cliente para obtener el OTP/QR
 @app.post("/otp/request", response_model=schemas.OtpResponse)
 def request_otp(req: schemas.OtpRequest, db: Session = Depends(get_db)):
@@ -101,7 +224,8 @@ def request_otp(req: schemas.OtpRequest, db: Session = Depends(get_db)):
             
             # marcamos el order con estado activa y además otorgamaos los hashes de otp, qr y gps! 
             session = crud.create_otp_session(
-                db, order.id, order.buyer_address, otp_hash, qr_hash, gps_buyer_hash, req.device_id, auto_commit=False
+                db, order.id, order.buyer_address, otp_hash, qr_hash, gps_buyer_hash, req.device_id, auto_commit=False,
+                merchant_address=order.merchant_address
             )
             
             # Only commit if everything is successful
@@ -139,6 +263,152 @@ def request_otp(req: schemas.OtpRequest, db: Session = Depends(get_db)):
     # This should never be reached, but just in case
     raise HTTPException(status_code=500, detail="Maximum retry attempts reached")
 
+@app.get("/otp/sessions", response_model=schemas.OtpSessionPage)
+def list_otp_sessions(
+    response: Response,
+    merchant_address: Optional[str] = None,
+    buyer_address: Optional[str] = None,
+    status: Optional[str] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Lists OTP/QR sessions newest first, using keyset pagination on (issued_at, otp_id).
+    OTP and QR hashes are never exposed.
+    """
+    rows = crud.list_otp_sessions(
+        db, limit,
+        after=_parse_cursor(cursor, to_id=lambda raw: uuid.UUID(bytes=raw)),
+        merchant_address=_parse_address(merchant_address, "merchant_address"),
+        buyer_address=_parse_address(buyer_address, "buyer_address"),
+        status=status,
+        created_after=_parse_time(created_after, "created_after"),
+        created_before=_parse_time(created_before, "created_before")
+    )
+    return _paginate(
+        rows, limit,
+        key_of=lambda s: (s.issued_at, s.otp_id.bytes),
+        state_of=lambda s: s.otp_id.bytes + s.status.encode() + s.attempts_used.to_bytes(4, "big"),
+        serialize=lambda s: {
+            "otp_id": str(s.otp_id),
+            "order_id": _hex(s.order_id),
+            "buyer_address": _hex(s.buyer_address),
+            "status": s.status,
+            "issued_at": _ts(s.issued_at),
+            "expires_at": _ts(s.expires_at),
+            "attempts_used": s.attempts_used,
+            "max_attempts": s.max_attempts
+        },
+        response=response,
+        if_none_match=if_none_match
+    )
+
+@app.get("/deliveries", response_model=schemas.DeliveryPage)
+def list_deliveries(
+    response: Response,
+    merchant_address: Optional[str] = None,
+    buyer_address: Optional[str] = None,
+    created_after: Optional[int] = None,
+    created_before: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Lists delivery records newest first, using keyset pagination on (created_at, delivery_id).
+    Filter order status through /orders; deliveries do not carry it.
+    """
+    rows = crud.list_deliveries(
+        db, limit,
+        after=_parse_cursor(cursor, to_id=lambda raw: uuid.UUID(bytes=raw)),
+        merchant_address=_parse_address(merchant_address, "merchant_address"),
+        buyer_address=_parse_address(buyer_address, "buyer_address"),
+        created_after=_parse_time(created_after, "created_after"),
+        created_before=_parse_time(created_before, "created_before")
+    )
+    # Delivery records are immutable once written, so the id alone identifies their state
+    return _paginate(
+        rows, limit,
+        key_of=lambda d: (d.created_at, d.delivery_id.bytes),
+        state_of=lambda d: d.delivery_id.bytes,
+        serialize=lambda d: {
+            "delivery_id": str(d.delivery_id),
+            "order_id": _hex(d.order_id),
+            "otp_id": str(d.otp_id),
+            "courier_id": d.courier_id,
+            "photo_uri": d.photo_uri or (content_uri(d.photo_sha256) if d.photo_sha256 else None),
+            "photo_sha256": d.photo_sha256,
+            "auth_nonce": _hex(d.auth_nonce),
+            "release_tx_hash": _hex(d.release_tx_hash),
+            "created_at": _ts(d.created_at)
+        },
+        response=response,
+        if_none_match=if_none_match
+    )
+
+def _register_delivery_photo(db: Session, sha256: str, size: int, content_type: str) -> bool:
+    """
+    Creates the DeliveryPhoto row and queues its processing. Returns True if it already existed;
+    a re-upload of a photo whose processing failed or was lost queues it again.
+    """
+    duplicate = crud.get_delivery_photo(db, sha256) is not None
+    if not duplicate:
+        try:
+            crud.create_delivery_photo(db, sha256, size, content_type)
+        except IntegrityError:
+            # Same content registered concurrently by another request
+            db.rollback()
+            duplicate = True
+    if not duplicate or crud.requeue_delivery_photo(db, sha256):
+        submit_delivery_photo(sha256)
+    return duplicate
+
+@app.post("/deliveries/photos", response_model=schemas.DeliveryPhotoResponse, status_code=201)
+async def upload_delivery_photo(
+    request: Request,
+    content_length: Optional[int] = Header(None),
+    db: Session = Depends(get_db)
+):
+    """
+    Courier-triggered endpoint to upload a delivery-proof photo (multipart field `file`)
+    before confirmation. The body is parsed as it arrives and each chunk goes straight
+    into the SHA-256 and the storage temp file; identical uploads are stored once.
+    """
+    if content_length is not None and content_length > settings.PHOTO_MAX_BYTES + MULTIPART_OVERHEAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Delivery photo exceeds {settings.PHOTO_MAX_BYTES} bytes")
+
+    storage = get_photo_storage()
+    writer = await run_in_threadpool(storage.open_writer, settings.PHOTO_MAX_BYTES)
+    try:
+        try:
+            content_type = await stream_multipart_file(
+                request.stream(), request.headers.get("content-type", ""), "file",
+                writer, settings.PHOTO_MAX_BYTES
+            )
+            sha256, size, _ = await run_in_threadpool(writer.commit)
+        except BaseException:
+            writer.abort()
+            raise
+    except PayloadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Delivery photo exceeds {settings.PHOTO_MAX_BYTES} bytes")
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except InvalidUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    duplicate = await run_in_threadpool(_register_delivery_photo, db, sha256, size, content_type)
+    return {
+        "sha256": sha256,
+        "size_bytes": size,
+        "photo_uri": content_uri(sha256),
+        "duplicate": duplicate
+    }
+
 @app.post("/deliveries/confirm", response_model=schemas.DeliveryConfirmationResponse)
 def confirm_delivery(req: schemas.DeliveryConfirmationRequest, db: Session = Depends(get_db)):
     """
@@ -167,6 +437,10 @@ def confirm_delivery(req: schemas.DeliveryConfirmationRequest, db: Session = Dep
     if not is_valid:
         raise HTTPException(status_code=403, detail="Invalid OTP or QR token")
 
+    # Uploaded photos are referenced by hash only; their URI is built when read
+    if req.photo_sha256 and not crud.get_delivery_photo(db, req.photo_sha256):
+        raise HTTPException(status_code=400, detail="Delivery photo not found")
+
     order = crud.get_order(db, order_id=order_id_bytes)
     
     # Se realiza la firma para confirmar la compra
@@ -190,9 +464,12 @@ def confirm_delivery(req: schemas.DeliveryConfirmationRequest, db: Session = Dep
         crud.create_delivery_record(db, {
             "order_id": order_id_bytes,
             "otp_id": session.otp_id,
+            "merchant_address": order.merchant_address,
+            "buyer_address": order.buyer_address,
             "courier_id": req.courier_id,
             "gps_courier_hash": gps_courier_hash,
             "photo_uri": req.photo_uri,
+            "photo_sha256": req.photo_sha256,
             "auth_nonce": bytes.fromhex(auth_dict["authNonce"][2:]),
             "release_tx_hash": bytes.fromhex(tx_hash[2:])
         })
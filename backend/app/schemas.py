@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, Field, constr, field_validator, model_validator
+from typing import List, Optional
 import uuid
 
 class GPSLocation(BaseModel):
@@ -27,7 +27,21 @@ class DeliveryConfirmationRequest(BaseModel):
     qr_token: Optional[str]
     gps_courier: GPSLocation
     courier_id: str
-    photo_uri: Optional[str]
+    photo_uri: Optional[str] = None # photo hosted elsewhere; mutually exclusive with photo_sha256
+    photo_sha256: Optional[constr(pattern=r'^[0-9a-fA-F]{64}$')] = None # content address returned by /deliveries/photos
+
+    @field_validator("photo_sha256")
+    @classmethod
+    def lowercase_photo_sha256(cls, value: Optional[str]) -> Optional[str]:
+        # Storage keys are lowercase hex
+        return value.lower() if value else value
+
+    @model_validator(mode="after")
+    def single_photo_reference(self):
+        # Otherwise the stored URI could disagree with the hash
+        if self.photo_uri and self.photo_sha256:
+            raise ValueError("Send either photo_uri or photo_sha256, not both")
+        return self
 
 class DeliveryConfirmationResponse(BaseModel):
     status: str
@@ -35,6 +49,13 @@ class DeliveryConfirmationResponse(BaseModel):
     auth_nonce: str
     expires_at: int
 
+# --- Delivery Photo ---
+class DeliveryPhotoResponse(BaseModel):
+    sha256: str
+    size_bytes: int
+    photo_uri: str
+    duplicate: bool
+
 # --- Order ---
 class OrderCreate(BaseModel):
     order_id: str # hex string
@@ -51,3 +72,49 @@ class OrderResponse(BaseModel):
 
     class Config:
         orm_mode = True
+
+class OrderOut(BaseModel):
+    order_id: str
+    merchant_address: str
+    buyer_address: str
+    amount: str
+    timeout: int # timestamp
+    status: str
+    created_at: int # timestamp
+    destination_lat: Optional[float]
+    destination_lon: Optional[float]
+
+class OrderPage(BaseModel):
+    items: List[OrderOut]
+    next_cursor: Optional[str]
+
+# --- OTP Session (read) ---
+class OtpSessionOut(BaseModel):
+    otp_id: str
+    order_id: str # hex string
+    buyer_address: str
+    status: str
+    issued_at: int # timestamp
+    expires_at: int # timestamp
+    attempts_used: int
+    max_attempts: int
+
+class OtpSessionPage(BaseModel):
+    items: List[OtpSessionOut]
+    next_cursor: Optional[str]
+
+# --- Delivery (read) ---
+class DeliveryOut(BaseModel):
+    delivery_id: str
+    order_id: str # hex string
+    otp_id: str
+    courier_id: str
+    photo_uri: Optional[str]
+    photo_sha256: Optional[str]
+    auth_nonce: Optional[str]
+    release_tx_hash: Optional[str]
+    created_at: int # timestamp
+
+class DeliveryPage(BaseModel):
+    items: List[DeliveryOut]
+    next_cursor: Optional[str]
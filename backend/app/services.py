@@ -1 +1,85 @@
-# Business logic services (OTP/QR generation, validation)
+# Business logic services (OTP/QR generation, validation, delivery photo processing)
+import io
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timezone
+from functools import lru_cache
+from typing import Optional
+
+import app.crud as crud
+from core.config import settings
+from database.database import SessionLocal
+from utils.photos import extract_exif_timestamp, make_thumbnail
+from utils.storage import LocalObjectStorage, ObjectStorage
+
+BACKEND_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Thumbnailing and EXIF parsing are CPU-bound, so they run off the request path.
+# The pool lives for one application lifespan; see start/shutdown_photo_executor.
+photo_executor: Optional[ThreadPoolExecutor] = None
+
+@lru_cache(maxsize=None)
+def get_photo_storage() -> ObjectStorage:
+    """
+    Returns the storage backend for delivery photos, created on first use.
+    A relative PHOTO_STORAGE_DIR is resolved against the backend directory, not the CWD.
+    """
+    return LocalObjectStorage(os.path.join(BACKEND_ROOT, settings.PHOTO_STORAGE_DIR))
+
+def process_delivery_photo(sha256: str):
+    """
+    Extracts the EXIF capture time and stores a thumbnail for a stored photo,
+    then records the result on its DeliveryPhoto row.
+    """
+    storage = get_photo_storage()
+    db = SessionLocal()
+    try:
+        try:
+            with storage.open(sha256) as photo:
+                taken_at = extract_exif_timestamp(photo)
+            with storage.open(sha256) as photo:
+                thumbnail = make_thumbnail(photo, settings.PHOTO_THUMBNAIL_SIZE, settings.PHOTO_MAX_PIXELS)
+            thumb_key, _, _ = storage.put_stream(io.BytesIO(thumbnail), settings.PHOTO_CHUNK_SIZE, settings.PHOTO_MAX_BYTES)
+        except Exception as e:
+            print(f"Failed to process delivery photo {sha256}: {e}")
+            crud.update_delivery_photo(db, sha256, {"status": "FAILED"})
+            return
+
+        crud.update_delivery_photo(db, sha256, {
+            "status": "PROCESSED",
+            # Stored in UTC so backends that drop the offset keep the same instant
+            "exif_taken_at": taken_at.astimezone(timezone.utc) if taken_at else None,
+            "thumbnail_sha256": thumb_key
+        })
+    finally:
+        db.close()
+
+def submit_delivery_photo(sha256: str):
+    """
+    Queues a photo for processing. Outside an application lifespan there is no pool;
+    the row stays PENDING and is picked up by the next startup.
+    """
+    if photo_executor is not None:
+        photo_executor.submit(process_delivery_photo, sha256)
+
+def resubmit_pending_delivery_photos():
+    """Queues photos left PENDING by a restart, since queued jobs do not survive the process."""
+    db = SessionLocal()
+    try:
+        pending = crud.get_pending_delivery_photo_hashes(db)
+    finally:
+        db.close()
+    for sha256 in pending:
+        submit_delivery_photo(sha256)
+
+def start_photo_executor():
+    global photo_executor
+    photo_executor = ThreadPoolExecutor(max_workers=settings.PHOTO_WORKERS, thread_name_prefix="photo")
+    resubmit_pending_delivery_photos()
+
+def shutdown_photo_executor():
+    global photo_executor
+    executor, photo_executor = photo_executor, None
+    if executor is not None:
+        # Queued jobs are dropped; their rows stay PENDING and are resubmitted on the next startup
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,93 @@
+"""
+Additive schema migrations for databases created before a column or index existed.
+Base.metadata.create_all only creates missing tables; it never alters existing ones.
+
+Run once per deploy, before starting the API workers:
+
+    python -m database.migrations
+"""
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from .database import Base, engine as default_engine
+
+# Rows backfilled per UPDATE, so no single statement locks a large table for long
+BACKFILL_BATCH_SIZE = 10000
+
+# Each entry is (table, column, orders column copied through `order_id`, or None for no backfill)
+ADDED_COLUMNS = [
+    ("otp_sessions", "merchant_address", "merchant_address"),
+    ("deliveries", "merchant_address", "merchant_address"),
+    ("deliveries", "buyer_address", "buyer_address"),
+    # Added without the delivery_photos foreign key, which ADD COLUMN cannot declare portably
+    ("deliveries", "photo_sha256", None),
+    ("delivery_photos", "thumbnail_sha256", None),
+]
+
+def _add_column(engine: Engine, table_name: str, column_name: str):
+    column = Base.metadata.tables[table_name].c[column_name]
+    column_type = column.type.compile(dialect=engine.dialect)
+    # A nullable column without a default is a catalog-only change
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type}"))
+
+def _backfill_from_orders(engine: Engine, table_name: str, column_name: str, order_column: str):
+    pk = Base.metadata.tables[table_name].primary_key.columns.values()[0].name
+    batch_sql = text(
+        f"UPDATE {table_name} SET {column_name} = "
+        f"(SELECT orders.{order_column} FROM orders WHERE orders.id = {table_name}.order_id) "
+        f"WHERE {pk} IN (SELECT {pk} FROM {table_name} "
+        f"WHERE {column_name} IS NULL AND order_id IN (SELECT id FROM orders) LIMIT :batch)"
+    )
+    while True:
+        # One short transaction per batch
+        with engine.begin() as conn:
+            updated = conn.execute(batch_sql, {"batch": BACKFILL_BATCH_SIZE}).rowcount
+        if not updated:
+            return
+
+def _create_index(engine: Engine, table_name: str, index):
+    columns = ", ".join(c.name for c in index.columns)
+    if engine.dialect.name == "postgresql":
+        # CONCURRENTLY keeps the table writable while the index builds; it cannot run in a transaction
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            # A previously interrupted concurrent build leaves an INVALID index behind; rebuild it
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+                "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+            ), {"name": index.name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index.name}"))
+            conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} ON {table_name} ({columns})"))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index.name} ON {table_name} ({columns})"))
+
+def run_migrations(engine: Engine):
+    """
+    Adds columns listed in ADDED_COLUMNS and any index declared on the models
+    that is missing from an existing table. Safe to run repeatedly.
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table_name, column_name, order_column in ADDED_COLUMNS:
+        if table_name not in existing_tables:
+            continue
+        existing_columns = {c["name"] for c in inspector.get_columns(table_name)}
+        if column_name not in existing_columns:
+            _add_column(engine, table_name, column_name)
+        # Also resumes a backfill interrupted by an earlier run
+        if order_column:
+            _backfill_from_orders(engine, table_name, column_name, order_column)
+
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        for index in table.indexes:
+            _create_index(engine, table.name, index)
+
+if __name__ == "__main__":
+    import database.models  # noqa: F401 -- registers the tables on Base.metadata
+    Base.metadata.create_all(bind=default_engine)
+    run_migrations(default_engine)
+    print("Migrations applied")
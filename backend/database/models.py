@@ -1,7 +1,7 @@
 import uuid
 from sqlalchemy import (
     Column, String, DateTime, Integer, LargeBinary, Text, ForeignKey,
-    UniqueConstraint
+    UniqueConstraint, Index
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
@@ -20,11 +20,20 @@ class Order(Base):
     destination_lat = Column(String)
     destination_lon = Column(String)
 
+    # Composite indexes backing keyset pagination on (created_at, id) for the read endpoints
+    __table_args__ = (
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+        Index('ix_orders_merchant_created_at_id', 'merchant_address', 'created_at', 'id'),
+        Index('ix_orders_buyer_created_at_id', 'buyer_address', 'created_at', 'id'),
+        Index('ix_orders_status_created_at_id', 'status', 'created_at', 'id'),
+    )
+
 class OtpSession(Base):
     __tablename__ = "otp_sessions"
     otp_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = Column(LargeBinary, ForeignKey("orders.id"), nullable=False)
     buyer_address = Column(LargeBinary, nullable=False)
+    merchant_address = Column(LargeBinary, nullable=True) # copied from the order so merchant listings use an index
     otp_hash = Column(LargeBinary, nullable=True)
     qr_token_hash = Column(LargeBinary, nullable=True)
     issued_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -35,7 +44,25 @@ class OtpSession(Base):
     gps_buyer_hash = Column(LargeBinary, nullable=True)
     buyer_device_id = Column(Text, nullable=True)
 
-    __table_args__ = (UniqueConstraint('order_id', name='uq_active_order_id', deferrable=True, initially='DEFERRED'),)
+    __table_args__ = (
+        # SQLite cannot declare a DEFERRABLE unique constraint; only emit it on PostgreSQL
+        UniqueConstraint('order_id', name='uq_active_order_id', deferrable=True, initially='DEFERRED').ddl_if(dialect='postgresql'),
+        Index('ix_otp_sessions_issued_at_otp_id', 'issued_at', 'otp_id'),
+        Index('ix_otp_sessions_buyer_issued_at_otp_id', 'buyer_address', 'issued_at', 'otp_id'),
+        Index('ix_otp_sessions_merchant_issued_at_otp_id', 'merchant_address', 'issued_at', 'otp_id'),
+        Index('ix_otp_sessions_status_issued_at_otp_id', 'status', 'issued_at', 'otp_id'),
+    )
+
+
+class DeliveryPhoto(Base):
+    __tablename__ = "delivery_photos"
+    sha256 = Column(String(64), primary_key=True) # hex SHA-256 of the content, also its storage key
+    size_bytes = Column(Integer, nullable=False)
+    content_type = Column(String, nullable=True)
+    status = Column(String, nullable=False, default='PENDING') # PENDING, PROCESSED, FAILED
+    exif_taken_at = Column(DateTime(timezone=True), nullable=True)
+    thumbnail_sha256 = Column(String(64), nullable=True) # storage key of the generated thumbnail
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class Delivery(Base):
@@ -43,9 +70,20 @@ class Delivery(Base):
     delivery_id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     order_id = Column(LargeBinary, ForeignKey("orders.id"), nullable=False)
     otp_id = Column(UUID(as_uuid=True), ForeignKey("otp_sessions.otp_id"), nullable=False)
+    # Copied from the order so merchant/buyer listings use an index instead of a join
+    merchant_address = Column(LargeBinary, nullable=True)
+    buyer_address = Column(LargeBinary, nullable=True)
     courier_id = Column(String, nullable=False)
     gps_courier_hash = Column(LargeBinary, nullable=False)
     photo_uri = Column(String, nullable=True)
+    photo_sha256 = Column(String(64), ForeignKey("delivery_photos.sha256"), nullable=True)
     auth_nonce = Column(LargeBinary, unique=True)
     release_tx_hash = Column(LargeBinary, unique=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index('ix_deliveries_created_at_delivery_id', 'created_at', 'delivery_id'),
+        Index('ix_deliveries_order_id_created_at', 'order_id', 'created_at'),
+        Index('ix_deliveries_merchant_created_at_delivery_id', 'merchant_address', 'created_at', 'delivery_id'),
+        Index('ix_deliveries_buyer_created_at_delivery_id', 'buyer_address', 'created_at', 'delivery_id'),
+    )
@@ -0,0 +1,70 @@
+import io
+import os
+
+import pytest
+from PIL import Image
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+# core.config builds Settings at import time; give the required values a harmless default
+# and point the engine at SQLite so tests never need a running PostgreSQL.
+os.environ.setdefault("CONTRACT_ADDRESS", "0x0000000000000000000000000000000000000000")
+os.environ.setdefault("USDC_ADDRESS", "0x0000000000000000000000000000000000000000")
+os.environ.setdefault("OPS_EOA_PRIVKEY", "0x" + "11" * 32)
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+
+@pytest.fixture
+def session_factory():
+    # One shared in-memory database, usable from the threads FastAPI runs sync endpoints in
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    import database.models as models
+    models.Base.metadata.create_all(engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client(session_factory):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from database.database import get_db
+
+    def override_get_db():
+        session = session_factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        yield TestClient(app)
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def make_jpeg():
+    """Builds a small JPEG, optionally with an EXIF capture time and UTC offset."""
+    def make(size=(32, 24), taken_at=None, offset=None, color="blue") -> bytes:
+        exif = Image.Exif()
+        if taken_at:
+            exif_ifd = exif.get_ifd(0x8769)
+            exif_ifd[0x9003] = taken_at
+            if offset:
+                exif_ifd[0x9011] = offset
+        out = io.BytesIO()
+        Image.new("RGB", size, color).save(out, "JPEG", exif=exif)
+        return out.getvalue()
+    return make
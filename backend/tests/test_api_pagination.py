@@ -0,0 +1,119 @@
+import uuid
+from datetime import datetime, timedelta
+
+import pytest
+
+import database.models as models
+
+MERCHANT = "0x" + "aa" * 20
+OTHER_MERCHANT = "0x" + "bb" * 20
+BUYER = "0x" + "cc" * 20
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _order(index: int, created_at: datetime, merchant: str = MERCHANT, status: str = "CREATED"):
+    return models.Order(
+        id=index.to_bytes(32, "big"),
+        merchant_address=bytes.fromhex(merchant[2:]),
+        buyer_address=bytes.fromhex(BUYER[2:]),
+        amount="1",
+        timeout=created_at + timedelta(days=1),
+        status=status,
+        created_at=created_at
+    )
+
+
+def _walk(client, path: str, **params):
+    """Follows next_cursor through the API, returning every page."""
+    pages, cursor = [], None
+    while True:
+        query = dict(params, **({"cursor": cursor} if cursor else {}))
+        response = client.get(path, params=query)
+        assert response.status_code == 200
+        body = response.json()
+        pages.append(body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return pages
+
+
+@pytest.fixture
+def orders(db):
+    # Four orders share one timestamp, so only the id tie-breaker separates them
+    for i in range(1, 5):
+        db.add(_order(i, BASE_TIME))
+    db.add(_order(5, BASE_TIME + timedelta(seconds=1), status="RELEASED"))
+    db.add(_order(6, BASE_TIME - timedelta(seconds=1), merchant=OTHER_MERCHANT))
+    db.commit()
+
+
+def test_orders_next_cursor_walks_every_row_once(client, orders):
+    pages = _walk(client, "/orders", limit=2)
+
+    ids = [int(item["order_id"], 16) for page in pages for item in page]
+    assert ids == [5, 4, 3, 2, 1, 6]
+    assert [len(page) for page in pages] == [2, 2, 2]
+
+
+def test_orders_filters(client, orders):
+    merchant_ids = [int(i["order_id"], 16) for i in client.get("/orders", params={"merchant_address": MERCHANT}).json()["items"]]
+    released = client.get("/orders", params={"status": "RELEASED"}).json()["items"]
+
+    assert merchant_ids == [5, 4, 3, 2, 1]
+    assert [int(i["order_id"], 16) for i in released] == [5]
+
+
+def test_orders_etag_returns_304_until_page_changes(client, db, orders):
+    first = client.get("/orders", params={"limit": 2})
+    etag = first.headers["etag"]
+    assert etag.startswith('W/"')
+
+    cached = client.get("/orders", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["etag"] == etag
+    assert cached.content == b""
+
+    db.query(models.Order).filter(models.Order.id == (5).to_bytes(32, "big")).update({"status": "REFUNDED"})
+    db.commit()
+
+    changed = client.get("/orders", params={"limit": 2}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/orders", {"cursor": "not-a-cursor"}),
+    ("/orders", {"merchant_address": "0x"}),
+    ("/orders", {"buyer_address": "0x" + "ab" * 3}),
+    ("/orders", {"merchant_address": "0xzz"}),
+    ("/orders", {"created_after": 10 ** 20}),
+    ("/otp/sessions", {"cursor": "eyJ0IjoiMjAyNC0wMS0wMVQwMDowMDowMCIsImlkIjoiMDEifQ"}),  # id is not a UUID
+    ("/deliveries", {"created_before": -(10 ** 20)}),
+])
+def test_invalid_query_parameters_return_400(client, path, params):
+    response = client.get(path, params=params)
+
+    assert response.status_code == 400
+
+
+def test_otp_sessions_keyset_handles_duplicate_timestamps(client, db):
+    db.add(_order(1, BASE_TIME))
+    db.commit()
+    otp_ids = sorted((uuid.uuid4() for _ in range(5)), reverse=True)
+    for i, otp_id in enumerate(otp_ids):
+        db.add(models.OtpSession(
+            otp_id=otp_id,
+            order_id=(1).to_bytes(32, "big"),
+            buyer_address=bytes.fromhex(BUYER[2:]),
+            merchant_address=bytes.fromhex(MERCHANT[2:]),
+            issued_at=BASE_TIME,
+            expires_at=BASE_TIME + timedelta(minutes=3),
+            status="USED" if i % 2 else "REVOKED"
+        ))
+    db.commit()
+
+    pages = _walk(client, "/otp/sessions", limit=2, merchant_address=MERCHANT)
+    used = client.get("/otp/sessions", params={"status": "USED"}).json()["items"]
+
+    assert [item["otp_id"] for page in pages for item in page] == [str(i) for i in otp_ids]
+    assert [item["otp_id"] for item in used] == [str(otp_ids[1]), str(otp_ids[3])]
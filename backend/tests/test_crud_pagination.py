@@ -0,0 +1,95 @@
+import uuid
+from datetime import datetime, timedelta
+
+import app.crud as crud
+import database.models as models
+
+MERCHANT = bytes.fromhex("aa" * 20)
+OTHER_MERCHANT = bytes.fromhex("bb" * 20)
+BUYER = bytes.fromhex("cc" * 20)
+BASE_TIME = datetime(2024, 1, 1, 12, 0, 0)
+
+
+def _add_order(db, index: int, created_at: datetime, merchant: bytes = MERCHANT):
+    order = models.Order(
+        id=index.to_bytes(32, "big"),
+        merchant_address=merchant,
+        buyer_address=BUYER,
+        amount="1",
+        timeout=created_at + timedelta(days=1),
+        created_at=created_at
+    )
+    db.add(order)
+    return order
+
+
+def _walk(list_page, limit: int):
+    """Follows cursors to the end, returning every page."""
+    pages, after = [], None
+    while True:
+        rows = list_page(limit, after)
+        page = rows[:limit]
+        pages.append(page)
+        if len(rows) <= limit:
+            return pages
+        after = (page[-1].created_at, page[-1].id)
+
+
+def test_list_orders_keyset_handles_duplicate_timestamps(db):
+    # Five orders share one timestamp, so only the id tie-breaker separates them
+    for i in range(1, 6):
+        _add_order(db, i, BASE_TIME)
+    _add_order(db, 6, BASE_TIME + timedelta(seconds=1))
+    _add_order(db, 7, BASE_TIME - timedelta(seconds=1))
+    db.commit()
+
+    pages = _walk(lambda limit, after: crud.list_orders(db, limit, after=after), limit=2)
+
+    ids = [int.from_bytes(o.id, "big") for page in pages for o in page]
+    assert ids == [6, 5, 4, 3, 2, 1, 7]
+    assert [len(page) for page in pages] == [2, 2, 2, 1]
+
+
+def test_list_orders_filters_and_time_range(db):
+    for i in range(1, 5):
+        _add_order(db, i, BASE_TIME + timedelta(minutes=i))
+    _add_order(db, 5, BASE_TIME + timedelta(minutes=2), merchant=OTHER_MERCHANT)
+    db.commit()
+
+    rows = crud.list_orders(
+        db, 10,
+        merchant_address=MERCHANT,
+        created_after=BASE_TIME + timedelta(minutes=2),
+        created_before=BASE_TIME + timedelta(minutes=4)
+    )
+
+    assert [int.from_bytes(o.id, "big") for o in rows] == [3, 2]
+
+
+def test_list_deliveries_keyset_handles_duplicate_timestamps(db):
+    delivery_ids = sorted((uuid.uuid4() for _ in range(5)), reverse=True)
+    for i, delivery_id in enumerate(delivery_ids):
+        db.add(models.Delivery(
+            delivery_id=delivery_id,
+            order_id=b"\x01" * 32,
+            otp_id=uuid.uuid4(),
+            merchant_address=MERCHANT,
+            buyer_address=BUYER,
+            courier_id="courier",
+            gps_courier_hash=b"\x00",
+            auth_nonce=bytes([i]),
+            release_tx_hash=bytes([i]),
+            created_at=BASE_TIME
+        ))
+    db.commit()
+
+    seen, after = [], None
+    while True:
+        rows = crud.list_deliveries(db, 2, after=after, merchant_address=MERCHANT)
+        page = rows[:2]
+        seen.extend(d.delivery_id for d in page)
+        if len(rows) <= 2:
+            break
+        after = (page[-1].created_at, page[-1].delivery_id)
+
+    assert seen == delivery_ids
@@ -0,0 +1,51 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from utils.pagination import encode_cursor, decode_cursor, compute_etag, etag_matches
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=timezone.utc)
+    row_id = bytes.fromhex("ab" * 32)
+
+    cursor = encode_cursor(created_at, row_id)
+
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, row_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not-base64!",
+    "eyJ0IjoiMjAyNCJ9",      # {"t":"2024"} without "id"
+    "eyJ0IjoieCIsImlkIjoiMDEifQ",  # {"t":"x","id":"01"}: bad timestamp
+    "WzFd",                  # [1]: not an object
+])
+def test_decode_cursor_rejects_malformed_input(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_compute_etag_is_weak_and_order_sensitive():
+    etag = compute_etag([b"a", b"b"])
+
+    assert etag.startswith('W/"')
+    assert etag == compute_etag([b"a", b"b"])
+    assert etag != compute_etag([b"b", b"a"])
+    # Length prefixes keep part boundaries significant
+    assert etag != compute_etag([b"ab"])
+
+
+def test_etag_matches():
+    etag = compute_etag([b"page"])
+    strong = etag[2:]
+
+    assert etag_matches(etag, etag)
+    assert etag_matches(strong, etag)
+    assert etag_matches("*", etag)
+    assert etag_matches(f'"other", {etag}', etag)
+    assert etag_matches(f'W/"other",{strong}', etag)
+    assert not etag_matches('"other"', etag)
+    assert not etag_matches(None, etag)
+    assert not etag_matches("", etag)
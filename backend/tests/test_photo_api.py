@@ -0,0 +1,200 @@
+import hashlib
+import io
+import os
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+from PIL import Image
+from pydantic import ValidationError
+
+import app.crud as crud
+import app.schemas as schemas
+import app.services as services
+import database.models as models
+from core.config import settings
+from utils.uploads import MULTIPART_OVERHEAD_BYTES
+
+MAX_BYTES = 4096
+BOUNDARY = "testboundary"
+MULTIPART = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+@pytest.fixture
+def photo_settings(tmp_path, monkeypatch, session_factory):
+    monkeypatch.setattr(settings, "PHOTO_STORAGE_DIR", str(tmp_path / "photos"))
+    monkeypatch.setattr(settings, "PHOTO_MAX_BYTES", MAX_BYTES)
+    monkeypatch.setattr(settings, "PHOTO_WORKERS", 1)
+    # Background jobs open their own sessions; point them at the test database
+    monkeypatch.setattr(services, "SessionLocal", session_factory)
+    services.get_photo_storage.cache_clear()
+    yield tmp_path / "photos"
+    services.get_photo_storage.cache_clear()
+
+
+def _upload(client, data: bytes, content_type: str = "image/jpeg"):
+    return client.post("/deliveries/photos", files={"file": ("photo.jpg", data, content_type)})
+
+
+def _photo(db, sha256: str):
+    db.expire_all()
+    return db.query(models.DeliveryPhoto).filter(models.DeliveryPhoto.sha256 == sha256).one()
+
+
+def test_upload_stores_photo_and_processes_it(client, db, photo_settings, make_jpeg):
+    photo = make_jpeg(size=(400, 300), taken_at="2024:05:01 10:00:00", offset="-03:00")
+    sha256 = hashlib.sha256(photo).hexdigest()
+
+    with client:
+        response = _upload(client, photo)
+    # Leaving the lifespan waits for the background pool to finish
+
+    assert response.status_code == 201
+    assert response.json() == {
+        "sha256": sha256, "size_bytes": len(photo), "photo_uri": f"sha256:{sha256}", "duplicate": False
+    }
+    row = _photo(db, sha256)
+    assert row.status == "PROCESSED"
+    assert row.content_type == "image/jpeg"
+    assert row.exif_taken_at.replace(tzinfo=timezone.utc) == datetime(2024, 5, 1, 13, 0, tzinfo=timezone.utc)
+    with services.get_photo_storage().open(row.thumbnail_sha256) as thumb, Image.open(thumb) as img:
+        assert max(img.size) == settings.PHOTO_THUMBNAIL_SIZE
+
+
+def test_duplicate_upload_comes_from_db_row_and_requeues_failed(client, db, photo_settings, make_jpeg):
+    photo = make_jpeg()
+    sha256 = hashlib.sha256(photo).hexdigest()
+
+    with client:
+        assert _upload(client, photo).json()["duplicate"] is False
+    crud.update_delivery_photo(db, sha256, {"status": "FAILED"})
+
+    with client:
+        response = _upload(client, photo)
+
+    assert response.json()["duplicate"] is True
+    assert db.query(models.DeliveryPhoto).count() == 1
+    assert _photo(db, sha256).status == "PROCESSED"
+
+
+def test_stored_object_without_row_is_not_a_duplicate(client, db, photo_settings, make_jpeg):
+    photo = make_jpeg()
+    services.get_photo_storage().put_stream(io.BytesIO(photo), 1024, MAX_BYTES)
+
+    response = _upload(client, photo)
+
+    assert response.json()["duplicate"] is False
+    # No lifespan, so no pool: the row waits for the next startup
+    assert _photo(db, response.json()["sha256"]).status == "PENDING"
+
+
+def test_pending_photos_are_processed_on_startup(client, db, photo_settings, make_jpeg):
+    photo = make_jpeg()
+    sha256 = _upload(client, photo).json()["sha256"]
+
+    with client:
+        pass
+
+    assert _photo(db, sha256).status == "PROCESSED"
+
+
+def test_content_length_over_limit_is_rejected_up_front(client, photo_settings):
+    body = b"\xff\xd8\xff" + b"x" * (MAX_BYTES + MULTIPART_OVERHEAD_BYTES)
+
+    response = _upload(client, body)
+
+    assert response.status_code == 413
+    # Rejected before storage was even opened
+    assert not photo_settings.exists()
+
+
+def _chunked(parts, chunk_size=1024):
+    """Multipart body sent without Content-Length, so only the running size can stop it."""
+    def body():
+        for name, content_type, data in parts:
+            yield (
+                f"--{BOUNDARY}\r\n"
+                f'Content-Disposition: form-data; name="{name}"; filename="photo"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n"
+            ).encode()
+            for i in range(0, len(data), chunk_size):
+                yield data[i:i + chunk_size]
+            yield b"\r\n"
+        yield f"--{BOUNDARY}--\r\n".encode()
+    return body()
+
+
+@pytest.mark.parametrize("parts", [
+    # The file itself passes PHOTO_MAX_BYTES
+    [("file", "image/jpeg", b"\xff\xd8\xff" + b"x" * (MAX_BYTES * 2))],
+    # A small file, but the whole body passes the limit plus multipart overhead
+    [("padding", "text/plain", b"x" * (MAX_BYTES + MULTIPART_OVERHEAD_BYTES)),
+     ("file", "image/jpeg", b"\xff\xd8\xff" + b"x" * 16)],
+])
+def test_chunked_body_is_aborted_mid_stream(client, photo_settings, parts):
+    response = client.post("/deliveries/photos", content=_chunked(parts), headers={"content-type": MULTIPART})
+
+    assert response.status_code == 413
+    assert os.listdir(photo_settings / "tmp") == []
+
+
+@pytest.mark.parametrize("data, content_type, status_code", [
+    (b"hello", "text/plain", 415),
+    (b"<html>not an image</html>", "image/jpeg", 415),
+    (None, "IMAGE/JPEG", 201),
+])
+def test_media_type_checks(client, photo_settings, make_jpeg, data, content_type, status_code):
+    response = _upload(client, data if data is not None else make_jpeg(), content_type)
+
+    assert response.status_code == status_code
+
+
+def test_malformed_requests_return_400(client, photo_settings, make_jpeg):
+    missing = client.post("/deliveries/photos", files={"other": ("a.jpg", make_jpeg(), "image/jpeg")})
+    not_multipart = client.post("/deliveries/photos", content=make_jpeg(), headers={"content-type": "image/jpeg"})
+
+    assert missing.status_code == 400
+    assert not_multipart.status_code == 400
+
+
+def test_process_rejects_images_over_pixel_limit(db, photo_settings, monkeypatch):
+    monkeypatch.setattr(settings, "PHOTO_MAX_PIXELS", 10_000)
+    out = io.BytesIO()
+    Image.new("RGB", (1000, 1000)).save(out, "PNG")
+    sha256, size, _ = services.get_photo_storage().put_stream(io.BytesIO(out.getvalue()), 1024, MAX_BYTES)
+    crud.create_delivery_photo(db, sha256, size, "image/png")
+
+    services.process_delivery_photo(sha256)
+
+    row = _photo(db, sha256)
+    assert row.status == "FAILED"
+    assert row.thumbnail_sha256 is None
+
+
+def test_deliveries_build_photo_uri_from_hash(client, db):
+    sha256 = "ab" * 32
+    db.add(models.Delivery(
+        delivery_id=uuid.uuid4(), order_id=b"\x01" * 32, otp_id=uuid.uuid4(), courier_id="courier",
+        gps_courier_hash=b"\x00", photo_sha256=sha256, auth_nonce=b"\x01", release_tx_hash=b"\x01"
+    ))
+    db.commit()
+
+    item = client.get("/deliveries").json()["items"][0]
+
+    assert item["photo_sha256"] == sha256
+    assert item["photo_uri"] == f"sha256:{sha256}"
+
+
+def _confirmation(**photo):
+    return dict(order_id="0x01", otp="123456", qr_token=None, courier_id="courier",
+                gps_courier={"lat": 0, "lon": 0, "timestamp": 0}, **photo)
+
+
+def test_confirmation_photo_fields():
+    assert schemas.DeliveryConfirmationRequest(**_confirmation()).photo_uri is None
+    assert schemas.DeliveryConfirmationRequest(**_confirmation(photo_sha256="AB" * 32)).photo_sha256 == "ab" * 32
+
+    with pytest.raises(ValidationError):
+        schemas.DeliveryConfirmationRequest(**_confirmation(photo_sha256="abc"))
+    with pytest.raises(ValidationError):
+        schemas.DeliveryConfirmationRequest(**_confirmation(photo_uri="https://x/y.jpg", photo_sha256="ab" * 32))
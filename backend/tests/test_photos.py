@@ -0,0 +1,76 @@
+import io
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from PIL import Image
+
+from utils.photos import (
+    ImageTooLarge, _parse_offset, extract_exif_timestamp, make_thumbnail, sniff_image_type
+)
+
+
+def _image_bytes(fmt: str, size=(8, 8)) -> bytes:
+    out = io.BytesIO()
+    Image.new("RGB", size).save(out, fmt)
+    return out.getvalue()
+
+
+@pytest.mark.parametrize("fmt, mime_type", [("JPEG", "image/jpeg"), ("PNG", "image/png"), ("WEBP", "image/webp")])
+def test_sniff_image_type_recognises_supported_formats(fmt, mime_type):
+    assert sniff_image_type(_image_bytes(fmt)[:12]) == mime_type
+
+
+@pytest.mark.parametrize("head", [b"", b"GIF89a......", b"<html><body>", b"RIFF\x00\x00\x00\x00WAVE"])
+def test_sniff_image_type_rejects_other_content(head):
+    assert sniff_image_type(head) is None
+
+
+@pytest.mark.parametrize("raw, expected", [
+    ("+05:30", timedelta(hours=5, minutes=30)),
+    ("-03:00", timedelta(hours=-3)),
+    ("+00:00\x00", timedelta(0)),
+    (None, timedelta(0)),
+    ("", timedelta(0)),
+    ("garbage", timedelta(0)),
+    ("+25:00", timedelta(0)),
+])
+def test_parse_offset(raw, expected):
+    assert _parse_offset(raw).utcoffset(None) == expected
+
+
+def test_extract_exif_timestamp_uses_offset(make_jpeg):
+    photo = make_jpeg(taken_at="2024:05:01 10:00:00", offset="+05:30")
+
+    taken_at = extract_exif_timestamp(io.BytesIO(photo))
+
+    assert taken_at == datetime(2024, 5, 1, 4, 30, tzinfo=timezone.utc)
+
+
+def test_extract_exif_timestamp_without_offset_is_utc(make_jpeg):
+    photo = make_jpeg(taken_at="2024:05:01 10:00:00")
+
+    taken_at = extract_exif_timestamp(io.BytesIO(photo))
+
+    assert taken_at == datetime(2024, 5, 1, 10, 0, tzinfo=timezone.utc)
+    assert taken_at.utcoffset() == timedelta(0)
+
+
+def test_extract_exif_timestamp_missing_or_malformed(make_jpeg):
+    assert extract_exif_timestamp(io.BytesIO(make_jpeg())) is None
+    assert extract_exif_timestamp(io.BytesIO(make_jpeg(taken_at="not a date"))) is None
+
+
+def test_make_thumbnail_fits_box(make_jpeg):
+    thumbnail = make_thumbnail(io.BytesIO(make_jpeg(size=(400, 200))), 64, max_pixels=1_000_000)
+
+    with Image.open(io.BytesIO(thumbnail)) as img:
+        assert img.format == "JPEG"
+        assert img.size == (64, 32)
+
+
+def test_make_thumbnail_rejects_images_over_pixel_limit():
+    # A PNG of one colour compresses to a few KB however large it is
+    big_png = _image_bytes("PNG", size=(2000, 2000))
+
+    with pytest.raises(ImageTooLarge):
+        make_thumbnail(io.BytesIO(big_png), 64, max_pixels=1_000_000)
@@ -0,0 +1,44 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from utils.storage import LocalObjectStorage, PayloadTooLarge, content_uri
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalObjectStorage(str(tmp_path / "objects"))
+
+
+def test_put_stream_is_content_addressed_and_deduplicates(storage):
+    data = os.urandom(200_000)
+
+    first = storage.put_stream(io.BytesIO(data), 64 * 1024, 1_000_000)
+    second = storage.put_stream(io.BytesIO(data), 1024, 1_000_000)
+
+    key = hashlib.sha256(data).hexdigest()
+    assert first == (key, len(data), False)
+    assert second == (key, len(data), True)
+    with storage.open(key) as stored:
+        assert stored.read() == data
+    assert content_uri(key) == f"sha256:{key}"
+    assert os.listdir(storage.tmp_dir) == []
+
+
+def test_put_stream_removes_temp_file_when_oversize(storage):
+    with pytest.raises(PayloadTooLarge):
+        storage.put_stream(io.BytesIO(b"x" * 1000), 64, 100)
+
+    assert os.listdir(storage.tmp_dir) == []
+    assert not storage.exists(hashlib.sha256(b"x" * 1000).hexdigest())
+
+
+def test_writer_abort_discards_partial_object(storage):
+    writer = storage.open_writer(1000)
+    writer.write(b"partial")
+    writer.abort()
+
+    assert os.listdir(storage.tmp_dir) == []
+    assert not storage.exists(hashlib.sha256(b"partial").hexdigest())
@@ -0,0 +1,85 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from utils.storage import LocalObjectStorage, PayloadTooLarge
+from utils.uploads import InvalidUpload, UnsupportedMediaType, stream_multipart_file
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def _body(parts):
+    out = b""
+    for name, content_type, data in parts:
+        out += (
+            f"--{BOUNDARY}\r\n"
+            f'Content-Disposition: form-data; name="{name}"; filename="photo"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n"
+        ).encode() + data + b"\r\n"
+    return out + f"--{BOUNDARY}--\r\n".encode()
+
+
+async def _chunks(body: bytes, size: int):
+    for i in range(0, len(body), size):
+        yield body[i:i + size]
+
+
+def _stream(storage, body: bytes, max_bytes: int = 1_000_000, chunk_size: int = 7):
+    writer = storage.open_writer(max_bytes)
+    try:
+        content_type = asyncio.run(
+            stream_multipart_file(_chunks(body, chunk_size), CONTENT_TYPE, "file", writer, max_bytes)
+        )
+    except BaseException:
+        writer.abort()
+        raise
+    return content_type, writer.commit()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalObjectStorage(str(tmp_path / "objects"))
+
+
+def test_streams_only_the_file_part(storage, make_jpeg):
+    photo = make_jpeg(size=(64, 64))
+    body = _body([("note", "text/plain", b"ignored"), ("file", "IMAGE/JPEG", photo)])
+
+    content_type, (key, size, duplicate) = _stream(storage, body)
+
+    assert content_type == "image/jpeg"
+    assert (key, size, duplicate) == (hashlib.sha256(photo).hexdigest(), len(photo), False)
+
+
+def test_content_type_is_sniffed_not_trusted(storage):
+    png_head = b"\x89PNG\r\n\x1a\n" + b"\x00" * 8
+    content_type, _ = _stream(storage, _body([("file", "image/jpeg", png_head)]), chunk_size=3)
+
+    assert content_type == "image/png"
+
+
+@pytest.mark.parametrize("declared, data", [
+    ("text/plain", b"\xff\xd8\xff" + b"\x00" * 20),  # real JPEG bytes, non-image label
+    ("image/jpeg", b"<html>not an image</html>"),    # image label, non-image bytes
+    ("image/jpeg", b"\xff\xd8"),                      # too short to be an image
+])
+def test_rejects_non_image_part(storage, declared, data):
+    with pytest.raises(UnsupportedMediaType):
+        _stream(storage, _body([("file", declared, data)]))
+
+
+def test_rejects_missing_part_and_truncated_body(storage, make_jpeg):
+    with pytest.raises(InvalidUpload):
+        _stream(storage, _body([("other", "image/jpeg", b"data")]))
+
+    body = _body([("file", "image/jpeg", make_jpeg())])
+    with pytest.raises(InvalidUpload):
+        _stream(storage, body[:-20])
+
+
+def test_aborts_mid_stream_when_file_exceeds_limit(storage):
+    photo = b"\xff\xd8\xff" + b"x" * 5000
+    with pytest.raises(PayloadTooLarge):
+        _stream(storage, _body([("file", "image/jpeg", photo)]), max_bytes=1000, chunk_size=512)
@@ -0,0 +1,51 @@
+import base64
+import hashlib
+import json
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+def encode_cursor(created_at: datetime, row_id: bytes) -> str:
+    """
+    Encodes the (created_at, id) keyset of the last row of a page into an
+    opaque, URL-safe cursor.
+    """
+    payload = json.dumps({"t": created_at.isoformat(), "id": row_id.hex()}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[datetime, bytes]:
+    """
+    Decodes a cursor produced by `encode_cursor`.
+    Raises ValueError if the cursor is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["t"]), bytes.fromhex(payload["id"])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def compute_etag(parts: Iterable[bytes]) -> str:
+    """
+    Builds a weak ETag from the fields that identify the state of each row in a page,
+    so an unchanged page can be answered with 304 without serializing its rows.
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(len(part).to_bytes(4, "big"))
+        digest.update(part)
+    return f'W/"{digest.hexdigest()[:32]}"'
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Checks an If-None-Match header value against an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
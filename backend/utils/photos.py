@@ -0,0 +1,73 @@
+import io
+from datetime import datetime, timedelta, timezone
+from typing import BinaryIO, Optional
+from PIL import Image
+
+# EXIF tags: DateTimeOriginal and its UTC offset live in the Exif IFD, DateTime in the main IFD
+EXIF_IFD_POINTER = 0x8769
+EXIF_DATETIME_ORIGINAL = 0x9003
+EXIF_OFFSET_TIME_ORIGINAL = 0x9011
+EXIF_DATETIME = 0x0132
+
+# Leading bytes needed to recognise every supported format
+SNIFF_BYTES = 12
+
+class ImageTooLarge(ValueError):
+    """Raised when an image has more pixels than the configured limit."""
+
+def sniff_image_type(head: bytes) -> Optional[str]:
+    """Returns the MIME type of a JPEG, PNG or WebP image from its leading bytes, or None."""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "image/jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "image/png"
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+def _parse_offset(raw) -> timezone:
+    """Parses an EXIF "+HH:MM" offset; EXIF times without one are treated as UTC."""
+    if not raw:
+        return timezone.utc
+    value = str(raw).strip("\x00 ")
+    sign = -1 if value.startswith("-") else 1
+    try:
+        hours, minutes = value.lstrip("+-").split(":")
+        return timezone(sign * timedelta(hours=int(hours), minutes=int(minutes)))
+    except ValueError:
+        return timezone.utc
+
+def extract_exif_timestamp(image_file: BinaryIO) -> Optional[datetime]:
+    """
+    Returns the capture time recorded in the image EXIF data, if any.
+    Only the image header is read, not the full pixel data.
+    """
+    with Image.open(image_file) as img:
+        exif = img.getexif()
+        exif_ifd = exif.get_ifd(EXIF_IFD_POINTER)
+        raw = exif_ifd.get(EXIF_DATETIME_ORIGINAL) or exif.get(EXIF_DATETIME)
+        offset = exif_ifd.get(EXIF_OFFSET_TIME_ORIGINAL)
+    if not raw:
+        return None
+    try:
+        taken_at = datetime.strptime(str(raw).strip("\x00 "), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    return taken_at.replace(tzinfo=_parse_offset(offset))
+
+def make_thumbnail(image_file: BinaryIO, size: int, max_pixels: int) -> bytes:
+    """
+    Returns a JPEG thumbnail that fits in a `size` x `size` box.
+    Raises ImageTooLarge before decoding any pixels if the image exceeds `max_pixels`.
+    """
+    with Image.open(image_file) as img:
+        # Image.open only parses the header, so the size is known without decoding
+        width, height = img.size
+        if width * height > max_pixels:
+            raise ImageTooLarge(f"Image is {width}x{height}, over the {max_pixels} pixel limit")
+        # draft() lets the JPEG decoder downscale while decoding, keeping memory bounded
+        img.draft("RGB", (size, size))
+        img.thumbnail((size, size))
+        out = io.BytesIO()
+        img.convert("RGB").save(out, "JPEG", quality=85)
+    return out.getvalue()
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import tempfile
+from abc import ABC, abstractmethod
+from typing import BinaryIO, Tuple
+
+class PayloadTooLarge(Exception):
+    """Raised when a streamed object exceeds the configured size limit."""
+
+def content_uri(key: str) -> str:
+    """
+    Backend-independent URI for a stored object. Only the hash is persisted,
+    so switching storage backends never leaves stale URIs behind.
+    """
+    return f"sha256:{key}"
+
+class ObjectWriter(ABC):
+    """
+    Receives an object chunk by chunk, hashing each chunk as it is written.
+    Exactly one of `commit` or `abort` must be called.
+    """
+    @abstractmethod
+    def write(self, chunk: bytes) -> None:
+        """Appends a chunk. Raises PayloadTooLarge once the size limit is passed."""
+
+    @abstractmethod
+    def commit(self) -> Tuple[str, int, bool]:
+        """Stores the object under its SHA-256. Returns (sha256_hex, size_bytes, duplicate)."""
+
+    @abstractmethod
+    def abort(self) -> None:
+        """Discards everything written so far."""
+
+class ObjectStorage(ABC):
+    """
+    Content-addressed object storage. Objects are keyed by the hex SHA-256 of their bytes,
+    so identical uploads map to the same key and are stored once.
+    """
+    @abstractmethod
+    def exists(self, key: str) -> bool:
+        """Whether an object is stored under `key`."""
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """Opens a stored object for reading."""
+
+    @abstractmethod
+    def open_writer(self, max_bytes: int) -> ObjectWriter:
+        """Starts a new streamed write of at most `max_bytes`."""
+
+    def put_stream(self, stream: BinaryIO, chunk_size: int, max_bytes: int) -> Tuple[str, int, bool]:
+        """
+        Copies a readable stream into storage chunk by chunk.
+        Returns (sha256_hex, size_bytes, duplicate).
+        """
+        writer = self.open_writer(max_bytes)
+        try:
+            while True:
+                chunk = stream.read(chunk_size)
+                if not chunk:
+                    break
+                writer.write(chunk)
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+class LocalObjectWriter(ObjectWriter):
+    def __init__(self, storage: "LocalObjectStorage", max_bytes: int):
+        self.storage = storage
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.digest = hashlib.sha256()
+        # Write to a temp file in the same filesystem so the final move is an atomic rename
+        fd, self.tmp_path = tempfile.mkstemp(dir=storage.tmp_dir)
+        self.tmp = os.fdopen(fd, "wb")
+
+    def write(self, chunk: bytes) -> None:
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            self.abort()
+            raise PayloadTooLarge(f"Object exceeds {self.max_bytes} bytes")
+        self.digest.update(chunk)
+        self.tmp.write(chunk)
+
+    def commit(self) -> Tuple[str, int, bool]:
+        self.tmp.close()
+        key = self.digest.hexdigest()
+        if self.storage.exists(key):
+            os.remove(self.tmp_path)
+            return key, self.size, True
+
+        path = self.storage._path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.tmp_path, path)
+        return key, self.size, False
+
+    def abort(self) -> None:
+        self.tmp.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class LocalObjectStorage(ObjectStorage):
+    """Stores objects on the local filesystem under `root/<aa>/<bb>/<sha256>`."""
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self.tmp_dir = os.path.join(self.root, "tmp")
+        os.makedirs(self.tmp_dir, exist_ok=True)
+
+    def _path_for(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key[2:4], key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self._path_for(key))
+
+    def open(self, key: str) -> BinaryIO:
+        return open(self._path_for(key), "rb")
+
+    def open_writer(self, max_bytes: int) -> ObjectWriter:
+        return LocalObjectWriter(self, max_bytes)
@@ -0,0 +1,126 @@
+from typing import AsyncIterator, Optional
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.concurrency import run_in_threadpool
+
+from utils.photos import SNIFF_BYTES, sniff_image_type
+from utils.storage import ObjectWriter, PayloadTooLarge
+
+# Room for boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+class InvalidUpload(Exception):
+    """Raised when a multipart body is malformed or lacks the expected file part."""
+
+class UnsupportedMediaType(InvalidUpload):
+    """Raised when the file part is not a supported image."""
+
+def _check_image(declared_type: str, head: bytes) -> str:
+    """
+    Checks both the declared Content-Type and the leading bytes of the file part,
+    returning the sniffed MIME type; clients cannot be trusted to label files correctly.
+    """
+    if not declared_type.lower().startswith("image/"):
+        raise UnsupportedMediaType("Delivery photo must be an image")
+    sniffed = sniff_image_type(head)
+    if sniffed is None:
+        raise UnsupportedMediaType("Delivery photo must be a JPEG, PNG or WebP image")
+    return sniffed
+
+async def stream_multipart_file(
+    body: AsyncIterator[bytes], content_type: str, field_name: str,
+    writer: ObjectWriter, max_bytes: int
+) -> str:
+    """
+    Parses a multipart/form-data body as it arrives and writes the bytes of the
+    `field_name` part straight into `writer`; nothing is buffered beyond one network chunk.
+    Returns the part's content type as sniffed from its leading bytes.
+    The caller commits or aborts the writer.
+    Raises PayloadTooLarge once the body or the file passes its limit, and
+    UnsupportedMediaType for non-image parts and InvalidUpload for malformed bodies.
+    """
+    mime_type, options = parse_options_header(content_type)
+    boundary = options.get(b"boundary")
+    if mime_type != b"multipart/form-data" or not boundary:
+        raise InvalidUpload("Expected a multipart/form-data body")
+
+    state = {
+        "in_file": False, "found": False, "complete": False, "declared_type": "", "content_type": None,
+        "header_field": b"", "header_value": b"", "headers": {}
+    }
+    pending = []
+
+    def on_part_begin():
+        state["headers"] = {}
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"], state["header_value"] = b"", b""
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        # Only the first part with the expected name is stored; any other part is skipped
+        state["in_file"] = not state["found"] and disposition.get(b"name") == field_name.encode()
+        if state["in_file"]:
+            state["found"] = True
+            state["declared_type"] = state["headers"].get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(data, start, end):
+        if state["in_file"]:
+            pending.append(data[start:end])
+
+    def on_part_end():
+        state["in_file"] = False
+
+    def on_end():
+        state["complete"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+        "on_end": on_end,
+    })
+
+    max_body_bytes = max_bytes + MULTIPART_OVERHEAD_BYTES
+    received = 0
+    async for chunk in body:
+        received += len(chunk)
+        if received > max_body_bytes:
+            raise PayloadTooLarge(f"Request body exceeds {max_body_bytes} bytes")
+        try:
+            parser.write(chunk)
+        except MultipartParseError as e:
+            raise InvalidUpload(f"Malformed multipart body: {e}")
+
+        if state["found"] and state["content_type"] is None:
+            head = b"".join(pending)
+            # Hold data back until enough of the part has arrived to sniff its format
+            if len(head) < SNIFF_BYTES and state["in_file"]:
+                continue
+            state["content_type"] = _check_image(state["declared_type"], head)
+        if pending:
+            # Hashing and disk writes run off the event loop
+            data = b"".join(pending)
+            pending.clear()
+            await run_in_threadpool(writer.write, data)
+
+    try:
+        parser.finalize()
+    except MultipartParseError as e:
+        raise InvalidUpload(f"Malformed multipart body: {e}")
+    if not state["complete"]:
+        raise InvalidUpload("Truncated multipart body")
+    if not state["found"]:
+        raise InvalidUpload(f"Missing '{field_name}' file part")
+    return state["content_type"]